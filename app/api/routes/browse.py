@@ -83,10 +83,11 @@ def browse(
                 None,
                 init_time,
             )
-        rclone_indexes = []
-        for key, category in rclone.items():
-            if media_type == category.data.get("type", "movies"):
-                rclone_indexes.append(category.index)
+        rclone_indexes = [
+            category.index
+            for category in rclone.values()
+            if media_type == category.data.get("type", "movies")
+        ]
         match = {"rclone_index": {"$in": rclone_indexes}}
         if query != "":
             match["title"] = {"$regex": f".*{query}.*", "$options": "i"}
@@ -102,16 +103,17 @@ def browse(
                     {"$skip": page * 20},
                     {"$limit": limit},
                     {"$project": unwanted_keys},
-                ]
+                ],
+                batchSize=limit,
             )
         )
     else:
-        for key, category in rclone.items():
-            if category.index == rclone_index:
-                if category.data.get("type") == "series":
-                    col = mongo.series_col
-                else:
-                    col = mongo.movies_col
+        # rclone is keyed by index, so the category is a direct lookup
+        category = rclone.get(rclone_index)
+        if category is not None and category.data.get("type") == "series":
+            col = mongo.series_col
+        else:
+            col = mongo.movies_col
         match = {"rclone_index": rclone_index}
         if year != 0:
             match["year"] = year
@@ -125,7 +127,8 @@ def browse(
                     {"$skip": page * 20},
                     {"$limit": limit},
                     {"$project": unwanted_keys},
-                ]
+                ],
+                batchSize=limit,
             )
         )
 
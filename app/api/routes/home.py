@@ -1,6 +1,12 @@
+import asyncio
+from app import logger
+from heapq import merge
 from app.apis import mongo
+from itertools import islice
 from time import perf_counter
 from app.models import DResponse
+from typing import List, TypedDict
+from app.core.cache import swr_cache
 from fastapi import Response, APIRouter
 
 
@@ -10,137 +16,211 @@ router = APIRouter(
 )
 
 data_cap_limit = 15
+carousel_cap = 6
+cache_ttl = 60
+cache_key = "home"
 
-unwanted_keys = {
+# inclusion projection: only ship the fields the home page cards render,
+# instead of excluding the known-heavy ones and shipping everything else
+wanted_keys = {
     "_id": 0,
-    "cast": 0,
-    "crew": 0,
-    "seasons": 0,
-    "file_name": 0,
-    "subtitles": 0,
-    "external_ids": 0,
-    "genres": 0,
-    "videos": 0,
-    "reviews": 0,
-    "collection": 0,
-    "homepage": 0,
-    "last_episode_to_air": 0,
-    "next_episode_to_air": 0,
-    "path": 0,
-    "parent": 0,
-    "revenue": 0,
-    "tagline": 0,
-    "imdb_id": 0,
+    "id": 1,
+    "modified_time": 1,
+    "number_of_files": 1,
+    "rclone_index": 1,
+    "size": 1,
+    "tmdb_id": 1,
+    "title": 1,
+    "original_title": 1,
+    "status": 1,
+    "popularity": 1,
+    "rating": 1,
+    "release_date": 1,
+    "year": 1,
+    "description": 1,
+    "runtime": 1,
+    "studios": 1,
+    "total_episodes": 1,
+    "total_seasons": 1,
+    "logo_path": 1,
+    "thumbnail_path": 1,
+    "backdrop_path": 1,
+    "poster_path": 1,
 }
 
 
-@router.get("", response_model=dict, status_code=200)
-def home(response: Response) -> dict:
-    init_time = perf_counter()
+# One pipeline per sort key, dispatched concurrently: a $facet would fuse
+# them into one round-trip but $facet sub-pipelines can never use indexes,
+# so each sort runs as its own aggregation and walks the matching
+# descending index from ensure_home_indexes. Every pipeline must keep the
+# $sort -> $limit -> $project order: with $sort immediately followed by
+# $limit the server only buffers the top data_cap_limit documents, and
+# projecting any earlier would break that. The pipelines never change
+# between refreshes, so they are built once here.
+most_popular_pipeline = [
+    {"$sort": {"popularity": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
+top_rated_pipeline = [
+    {"$sort": {"rating": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
+newly_released_movies_pipeline = [
+    {"$sort": {"modified_time": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
+newly_added_movies_pipeline = [
+    {"$sort": {"release_date": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
+newly_released_episodes_pipeline = [
+    {
+        "$addFields": {
+            "last_episode_air_date": {"$first": {"$max": "$seasons.episodes.air_date"}}
+        }
+    },
+    {"$sort": {"last_episode_air_date": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
+newly_added_episodes_pipeline = [
+    {
+        "$addFields": {
+            "last_episode_modified_time": {
+                "$first": {"$max": "$seasons.episodes.modified_time"}
+            }
+        }
+    },
+    {"$sort": {"last_episode_modified_time": -1}},
+    {"$limit": data_cap_limit},
+    {"$project": wanted_keys},
+]
 
-    if not mongo.is_config_init:
-        response.status_code = 428
-        return DResponse(
-            428,
-            "The config needs to be initialized first.",
-            False,
-            "/settings",
-            init_time,
-        ).__json__()
 
-    most_popular_movies_data = list(
-        mongo.movies_col.aggregate(
-            [
-                {"$sort": {"popularity": -1}},
-                {"$limit": data_cap_limit},
-                {"$project": unwanted_keys},
-            ]
-        )
-    )
-    most_popular_series_data = list(
-        mongo.series_col.aggregate(
-            [
-                {"$sort": {"popularity": -1}},
-                {"$limit": data_cap_limit},
-                {"$project": unwanted_keys},
-            ]
+class HomeResult(TypedDict):
+    """Shape of the cached home payload; keys mirror the frontend sections"""
+
+    carousel: List[dict]
+    most_popular_movies: List[dict]
+    most_popular_series: List[dict]
+    top_rated_movies: List[dict]
+    top_rated_series: List[dict]
+    newly_released_movies: List[dict]
+    newly_released_episodes: List[dict]
+    newly_added_movies: List[dict]
+    newly_added_episodes: List[dict]
+
+
+def _merge_top(*sorted_lists: list, cap: int = carousel_cap) -> list:
+    """Takes the top `cap` items across lists already sorted by popularity.
+
+    Stays O(cap) however many lists are merged; use this for any new
+    cross-collection section instead of sorting a concatenated list,
+    which would re-sort everything on every refresh.
+    """
+    return list(
+        islice(
+            merge(
+                *sorted_lists,
+                key=lambda item: item.get("popularity", 0),
+                reverse=True,
+            ),
+            cap,
         )
     )
-    carousel_data = []
-    carousel_data.extend(most_popular_movies_data[:3] + most_popular_series_data[:3])
-
-    top_rated_movies_data = mongo.movies_col.aggregate(
-        [
-            {"$sort": {"rating": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
-    )
-    top_rated_series_data = mongo.series_col.aggregate(
-        [
-            {"$sort": {"rating": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
-    )
 
-    newly_released_movies_data = mongo.movies_col.aggregate(
-        [
-            {"$sort": {"modified_time": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
-    )
 
-    newly_released_episodes_data = mongo.series_col.aggregate(
-        [
-            {
-                "$addFields": {
-                    "last_episode_air_date": {
-                        "$first": {"$max": "$seasons.episodes.air_date"}
-                    }
-                }
-            },
-            {"$sort": {"last_episode_air_date": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
+async def _build_home_result() -> HomeResult:
+    """Runs the home page aggregations and assembles the response payload"""
+    query_start = perf_counter()
+    (
+        most_popular_movies_data,
+        most_popular_series_data,
+        top_rated_movies_data,
+        top_rated_series_data,
+        newly_released_movies_data,
+        newly_released_episodes_data,
+        newly_added_movies_data,
+        newly_added_episodes_data,
+    ) = await asyncio.gather(
+        mongo.async_movies_col.aggregate(
+            most_popular_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_series_col.aggregate(
+            most_popular_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_movies_col.aggregate(
+            top_rated_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_series_col.aggregate(
+            top_rated_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_movies_col.aggregate(
+            newly_released_movies_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_series_col.aggregate(
+            newly_released_episodes_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_movies_col.aggregate(
+            newly_added_movies_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
+        mongo.async_series_col.aggregate(
+            newly_added_episodes_pipeline, batchSize=data_cap_limit
+        ).to_list(data_cap_limit),
     )
+    query_time = perf_counter() - query_start
 
-    newly_added_movies_data = mongo.movies_col.aggregate(
-        [
-            {"$sort": {"release_date": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
-    )
-    newly_added_episodes_data = mongo.series_col.aggregate(
-        [
-            {
-                "$addFields": {
-                    "last_episode_modified_time": {
-                        "$first": {"$max": "$seasons.episodes.modified_time"}
-                    }
-                }
-            },
-            {"$sort": {"last_episode_modified_time": -1}},
-            {"$limit": data_cap_limit},
-            {"$project": unwanted_keys},
-        ]
+    assemble_start = perf_counter()
+    carousel_data = _merge_top(most_popular_movies_data, most_popular_series_data)
+    logger.debug(
+        "Home rebuild: queries %.3fs, assembly %.3fs",
+        query_time,
+        perf_counter() - assemble_start,
     )
 
-    result = {
+    return {
         "carousel": carousel_data,
         "most_popular_movies": most_popular_movies_data,
         "most_popular_series": most_popular_series_data,
-        "top_rated_movies": list(top_rated_movies_data),
-        "top_rated_series": list(top_rated_series_data),
-        "newly_released_movies": list(newly_released_movies_data),
-        "newly_released_episodes": list(newly_released_episodes_data),
-        "newly_added_movies": list(newly_added_movies_data),
-        "newly_added_episodes": list(newly_added_episodes_data),
+        "top_rated_movies": top_rated_movies_data,
+        "top_rated_series": top_rated_series_data,
+        "newly_released_movies": newly_released_movies_data,
+        "newly_released_episodes": newly_released_episodes_data,
+        "newly_added_movies": newly_added_movies_data,
+        "newly_added_episodes": newly_added_episodes_data,
     }
 
+
+async def periodic_home_refresh(interval: int = cache_ttl):
+    """Keeps the home cache warm so requests never pay the rebuild cost"""
+    while True:
+        try:
+            await swr_cache.get_or_set_swr(cache_key, _build_home_result, cache_ttl)
+        except Exception as e:
+            logger.warning("Home cache refresh failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+@router.get("", status_code=200)
+async def home(response: Response) -> dict:
+    init_time = perf_counter()
+
+    if not mongo.is_config_init:
+        response.status_code = 428
+        return DResponse(
+            428,
+            "The config needs to be initialized first.",
+            False,
+            "/settings",
+            init_time,
+        ).__json__()
+
+    result = await swr_cache.get_or_set_swr(cache_key, _build_home_result, cache_ttl)
+
     return DResponse(
         200, "Home page data successfully retrieved.", True, result, init_time
     ).__json__()
@@ -48,7 +48,8 @@ def query(
             {"$limit": limit},
             {"$addFields": {"textScore": {"$meta": "textScore"}}},
             {"$project": unwanted_keys},
-        ]
+        ],
+        batchSize=limit,
     )
     series_match = mongo.series_col.aggregate(
         [
@@ -57,7 +58,8 @@ def query(
             {"$limit": limit},
             {"$addFields": {"textScore": {"$meta": "textScore"}}},
             {"$project": unwanted_keys},
-        ]
+        ],
+        batchSize=limit,
     )
     result = {"movies": list(movies_match), "series": list(series_match)}
     return DResponse(
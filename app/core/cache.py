@@ -0,0 +1,110 @@
+import orjson
+import asyncio
+from app import logger
+from time import monotonic
+from app.settings import settings
+from typing import Callable, Awaitable
+
+
+class SWRCache:
+    """Stale-while-revalidate cache with single-flight refresh.
+
+    Serves whatever copy it has and rebuilds stale entries in the
+    background, so the rebuild cost never lands on a request. When
+    REDIS_URL is configured the entries live in Redis and are shared
+    between workers, with a SET NX key as the cross-worker single-flight
+    lock; otherwise everything stays in an in-process dict.
+    """
+
+    def __init__(self):
+        self._data: dict = {}
+        self._locks: dict = {}
+        self._redis = None
+        if settings.REDIS_URL:
+            import redis.asyncio as redis_asyncio
+
+            self._redis = redis_asyncio.from_url(settings.REDIS_URL)
+
+    async def get_or_set_swr(
+        self, key: str, builder: Callable[[], Awaitable], ttl: int = 60
+    ):
+        """Returns the cached value for `key`, refreshing it via `builder`
+
+        Fresh hits return immediately, stale hits return the old copy and
+        refresh in the background, and only a cold miss awaits the build.
+        """
+        if self._redis is not None:
+            return await self._get_or_set_redis(key, builder, ttl)
+        return await self._get_or_set_local(key, builder, ttl)
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    async def _guarded(self, key: str, coro):
+        """Runs a background refresh, logging failures instead of losing them"""
+        try:
+            await coro
+        except Exception as e:
+            logger.warning("Background refresh of cache key '%s' failed: %s", key, e)
+
+    async def _get_or_set_local(self, key, builder, ttl):
+        entry = self._data.get(key)
+        if entry is None:
+            await self._refresh_local(key, builder, ttl)
+            entry = self._data[key]
+        elif monotonic() >= entry["fresh_until"]:
+            asyncio.create_task(
+                self._guarded(key, self._refresh_local(key, builder, ttl))
+            )
+        return entry["value"]
+
+    async def _refresh_local(self, key, builder, ttl):
+        # every caller takes the lock and re-checks the entry: concurrent
+        # tasks wait for the one holding it, and if that build failed the
+        # next waiter retries instead of finding the key still missing
+        async with self._lock(key):
+            entry = self._data.get(key)
+            if entry is not None and monotonic() < entry["fresh_until"]:
+                return
+            self._data[key] = {
+                "value": await builder(),
+                "fresh_until": monotonic() + ttl,
+            }
+
+    async def _get_or_set_redis(self, key, builder, ttl):
+        cached, fresh = await asyncio.gather(
+            self._redis.get(key), self._redis.get(f"{key}:fresh")
+        )
+        if cached is not None:
+            if fresh is None:
+                asyncio.create_task(
+                    self._guarded(key, self._refresh_redis(key, builder, ttl))
+                )
+            return orjson.loads(cached)
+        await self._refresh_redis(key, builder, ttl)
+        cached = await self._redis.get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+        # another worker holds the flight lock; it will populate the key
+        for _ in range(100):
+            await asyncio.sleep(0.1)
+            cached = await self._redis.get(key)
+            if cached is not None:
+                return orjson.loads(cached)
+        return await builder()
+
+    async def _refresh_redis(self, key, builder, ttl):
+        # SET NX acts as the single-flight lock across workers
+        if not await self._redis.set(f"{key}:refreshing", 1, nx=True, ex=30):
+            return
+        try:
+            value = await builder()
+            await asyncio.gather(
+                self._redis.set(key, orjson.dumps(value)),
+                self._redis.set(f"{key}:fresh", 1, ex=ttl),
+            )
+        finally:
+            await self._redis.delete(f"{key}:refreshing")
+
+
+swr_cache = SWRCache()
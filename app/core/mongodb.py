@@ -1,7 +1,8 @@
 import certifi
 from croniter import croniter
 from datetime import datetime, timezone
-from pymongo import TEXT, UpdateOne, MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import TEXT, DESCENDING, UpdateOne, MongoClient
 
 
 class MongoDB:
@@ -12,9 +13,12 @@ class MongoDB:
         self.username = username
         self.password = password
         self.tlsca_ = certifi.where()
+        # fail fast when the cluster is unreachable instead of letting
+        # callers hang for the 30s driver default
         self.client = MongoClient(
             f"mongodb+srv://{username}:{password}@{domain}/?retryWrites=true&w=majority",
             tlsCAFile=self.tlsca_,
+            serverSelectionTimeoutMS=10000,
         )
         self.db = self.client["main"]
         self.metadata = self.client["metadata"]
@@ -30,6 +34,15 @@ class MongoDB:
         self.series_col = self.metadata["series"]
         self.series_cache_col = self.metadata["series_cache"]
 
+        self.async_client = AsyncIOMotorClient(
+            f"mongodb+srv://{username}:{password}@{domain}/?retryWrites=true&w=majority",
+            tlsCAFile=self.tlsca_,
+            serverSelectionTimeoutMS=10000,
+        )
+        self.async_metadata = self.async_client["metadata"]
+        self.async_movies_col = self.async_metadata["movies"]
+        self.async_series_col = self.async_metadata["series"]
+
         self.config = {
             "app": {},
             "auth0": {},
@@ -54,6 +67,18 @@ class MongoDB:
         self.is_series_cache_init = False
         self.get_is_series_cache_init()
 
+    def ensure_home_indexes(self):
+        """Creates the descending indexes backing the home page sorts"""
+        for key in ("popularity", "rating", "modified_time", "release_date"):
+            self.movies_col.create_index(
+                [(key, DESCENDING)], background=True, name=key
+            )
+        for key in ("popularity", "rating"):
+            self.series_col.create_index(
+                [(key, DESCENDING)], background=True, name=key
+            )
+        return
+
     def get_config(self) -> dict:
         """Returns the entire MongoDB config"""
         config = {
@@ -183,7 +208,7 @@ class MongoDB:
         self.set_is_config_init(True)
 
         if self.is_metadata_init is False:
-            from main import rclone_setup
+            from app.core.rclone import rclone_setup
 
             await rclone_setup(self.config["categories"])
             return 2
@@ -1,9 +1,169 @@
+import os
+import shlex
+import asyncio
 import requests
 import regex as re
 import ujson as json
 from os import path
+from shutil import which
+from sys import platform
 from typing import Optional
 from app.settings import settings
+from app import logger, rclone_logger
+from subprocess import PIPE, STDOUT, DEVNULL, run
+
+
+async def restart_rclone():
+    """Force closes any running instances of the Rclone port then starts an Rclone RC server"""
+    if platform in ("win32", "cygwin", "msys"):
+        run(
+            shlex.split(
+                f"powershell.exe Stop-Process -Id (Get-NetTCPConnection -LocalPort {settings.RCLONE_LISTEN_PORT}).OwningProcess -Force"
+            ),
+            check=False,
+            stdout=DEVNULL,
+            stderr=STDOUT,
+        )
+    elif platform in ("linux", "linux2"):
+        run(
+            shlex.split(f"bash kill $(lsof -t -i:{settings.RCLONE_LISTEN_PORT})"),
+            check=False,
+            stdout=DEVNULL,
+            stderr=STDOUT,
+        )
+    elif platform in ("darwin"):
+        run(
+            shlex.split(f"kill $(lsof -t -i:{settings.RCLONE_LISTEN_PORT})"),
+            check=False,
+            stdout=DEVNULL,
+            stderr=STDOUT,
+        )
+    else:
+        exit("Unsupported platform")
+    if not os.path.isdir("bin"):
+        os.mkdir("bin")
+    rclone_bin = (
+        f"bin/rclone{'.exe' if platform in ('win32', 'cygwin', 'msys') else ''}"
+    )
+    if not os.path.exists(rclone_bin):
+        rclone_bin = which("rclone")
+    if not rclone_bin:
+        from scripts.install_rclone import download_rclone
+
+        rclone_bin = download_rclone()
+        if not rclone_bin:
+            logger.error("Couldn't find rclone executable")
+            logger.error(
+                "Please download a suitable executable of rclone from 'rclone.org' and move it to the 'bin' folder."
+            )
+            quit(1)
+    # --fast-list lets remotes that support ListR answer the recursive
+    # metadata listings with far fewer API calls
+    rclone_args = shlex.split(
+        f"{rclone_bin} rcd --rc-no-auth --rc-serve --rc-addr localhost:{settings.RCLONE_LISTEN_PORT} --fast-list --config rclone.conf --log-level INFO",
+        posix=(platform not in ("win32", "cygwin", "msys")),
+    )
+    try:
+        rclone_process = await asyncio.create_subprocess_exec(
+            *rclone_args,
+            stdout=PIPE,
+            stderr=STDOUT,
+        )
+    except PermissionError:
+        await (
+            await asyncio.create_subprocess_exec("chmod", "+x", rclone_bin)
+        ).communicate()
+        rclone_process = await asyncio.create_subprocess_exec(
+            *rclone_args,
+            stdout=PIPE,
+            stderr=STDOUT,
+        )
+    # stderr is merged into stdout above, so everything the daemon prints
+    # while starting comes through this one pipe
+    startup_output: list = []
+    while True:
+        out_line = await rclone_process.stdout.readline()
+        if out_line == b"":
+            # EOF means the daemon is gone; wait() reaps it and yields so
+            # the loop can run the exit callback that sets returncode
+            await rclone_process.wait()
+            logger.error(
+                "Failed to start rclone subprocess (exit code %s)",
+                rclone_process.returncode,
+            )
+            logger.error("".join(startup_output))
+            return
+        startup_output.append(out_line.decode())
+        if "Serving remote control on" in out_line.decode():
+            break
+    # poll the RC endpoint until it answers instead of sleeping a fixed second
+    for _ in range(50):
+        try:
+            requests.post(
+                f"http://localhost:{settings.RCLONE_LISTEN_PORT}/core/version",
+                timeout=1,
+            )
+            break
+        except requests.ConnectionError:
+            await asyncio.sleep(0.1)
+    else:
+        logger.error("rclone RC endpoint never became ready")
+        return
+    logger.info("Started rclone")
+    asyncio.get_event_loop().create_task(log_rclone(rclone_process))
+
+
+async def log_rclone(rclone_process: asyncio.subprocess.Process):
+    rclone_logger.info("Starting rclone logger")
+    while True:
+        out_line = await rclone_process.stdout.readline()
+        if out_line == b"":
+            # stderr is merged into this pipe, so EOF means the daemon died
+            await rclone_process.wait()
+            logger.error(
+                "rclone subprocess exited (exit code %s)",
+                rclone_process.returncode,
+            )
+            break
+        match = re.match(
+            r"(?:[\d\/])+ (?:[\d:]+) (?P<level>\w+) ? ? :? (?P<message>.*)$",
+            out_line.decode(),
+            flags=2,
+        )
+        if not match:
+            continue
+        data = match.groupdict()
+        levels = {
+            "CRITICAL": 50,
+            "FATAL": 50,
+            "ERROR": 40,
+            "WARNING": 30,
+            "WARN": 30,
+            "INFO": 20,
+            "DEBUG": 10,
+        }
+        rclone_logger.log(
+            levels.get(data.get("levels", "INFO").upper()), data.get("message")
+        )
+
+
+async def rclone_setup(categories: list):
+    """Initializes the rclone.conf file"""
+    from app.apis import mongo, rclone
+
+    rclone_conf = ""
+    for item in mongo.config["rclone"]:
+        rclone_conf += f"\n\n{item}"
+    with open("rclone.conf", "w+", encoding="utf-8") as w:
+        w.write(rclone_conf)
+
+    await restart_rclone()
+
+    # rebuild the registry from scratch so entries for removed categories
+    # don't linger after a reconfigure
+    rclone.clear()
+    for i, category in enumerate(categories):
+        rclone[i] = RCloneAPI(category, i)
 
 
 def build_config(config) -> list:
@@ -74,7 +234,7 @@ def build_config(config) -> list:
 
 
 class RCloneAPI:
-    def __init__(self, data: dict, index: int, port=35530):
+    def __init__(self, data: dict, index: int, port=settings.RCLONE_LISTEN_PORT):
         self.data: dict = data
         self.index: int = index
         self.id: str = data.get("id") or data.get("drive_id") or ""
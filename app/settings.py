@@ -14,6 +14,8 @@ class _Settings(BaseSettings):
 
     RCLONE_LISTEN_PORT: int = int(getenv("RCLONE_LISTEN_PORT", "35530"))
 
+    REDIS_URL: str = getenv("REDIS_URL", "")
+
     MONGODB_DOMAIN: str = getenv("MONGODB_DOMAIN")
     MONGODB_USERNAME: str = getenv("MONGODB_USERNAME")
     MONGODB_PASSWORD: str = getenv("MONGODB_PASSWORD")
@@ -1,24 +1,20 @@
 import os
-import re
 import time
-import shlex
 import asyncio
 import uvicorn
-from shutil import which
-from sys import platform
 from fastapi import FastAPI
+from app.apis import mongo
 from app.api import main_router
 from app.settings import settings
-from app.apis import mongo, rclone
+from app import logger, __version__
 from app.utils import time_formatter
-from app.core.rclone import RCloneAPI
 from datetime import datetime, timezone
 from app.core.cron import fetch_metadata
+from app.core.rclone import rclone_setup
 from fastapi.staticfiles import StaticFiles
-from subprocess import PIPE, STDOUT, DEVNULL, run
-from app import logger, __version__, rclone_logger
+from app.api.routes.home import periodic_home_refresh
 from starlette.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, UJSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 
@@ -40,128 +36,6 @@ except RuntimeError:
     loop = asyncio
 
 
-async def restart_rclone():
-    """Force closes any running instances of the Rclone port then starts an Rclone RC server"""
-    if platform in ("win32", "cygwin", "msys"):
-        run(
-            shlex.split(
-                f"powershell.exe Stop-Process -Id (Get-NetTCPConnection -LocalPort {settings.RCLONE_LISTEN_PORT}).OwningProcess -Force"
-            ),
-            check=False,
-            stdout=DEVNULL,
-            stderr=STDOUT,
-        )
-    elif platform in ("linux", "linux2"):
-        run(
-            shlex.split(f"bash kill $(lsof -t -i:{settings.RCLONE_LISTEN_PORT})"),
-            check=False,
-            stdout=DEVNULL,
-            stderr=STDOUT,
-        )
-    elif platform in ("darwin"):
-        run(
-            shlex.split(f"kill $(lsof -t -i:{settings.RCLONE_LISTEN_PORT})"),
-            check=False,
-            stdout=DEVNULL,
-            stderr=STDOUT,
-        )
-    else:
-        exit("Unsupported platform")
-    if not os.path.isdir("bin"):
-        os.mkdir("bin")
-    rclone_bin = (
-        f"bin/rclone{'.exe' if platform in ('win32', 'cygwin', 'msys') else ''}"
-    )
-    if not os.path.exists(rclone_bin):
-        rclone_bin = which("rclone")
-    if not rclone_bin:
-        from scripts.install_rclone import download_rclone
-
-        rclone_bin = download_rclone()
-        if not rclone_bin:
-            logger.error("Couldn't find rclone executable")
-            logger.error(
-                "Please download a suitable executable of rclone from 'rclone.org' and move it to the 'bin' folder."
-            )
-            quit(1)
-    try:
-        rclone_process = await asyncio.create_subprocess_exec(
-            *shlex.split(
-                f"{rclone_bin} rcd --rc-no-auth --rc-serve --rc-addr localhost:{settings.RCLONE_LISTEN_PORT} --config rclone.conf --log-level INFO",
-                posix=(platform not in ("win32", "cygwin", "msys")),
-            ),
-            stdout=PIPE,
-            stderr=STDOUT,
-        )
-    except PermissionError:
-        await (
-            await asyncio.create_subprocess_exec("chmod", "+x", rclone_bin)
-        ).communicate()
-        rclone_process = await asyncio.create_subprocess_exec(
-            *shlex.split(
-                f"{rclone_bin} rcd --rc-no-auth --rc-serve --rc-addr localhost:{settings.RCLONE_LISTEN_PORT} --config rclone.conf --log-level INFO",
-                posix=(platform not in ("win32", "cygwin", "msys")),
-            ),
-            stdout=PIPE,
-            stderr=STDOUT,
-        )
-    while True:
-        out_line = await rclone_process.stdout.readline()
-        if out_line == b"" and rclone_process.returncode == 0:
-            err = await rclone_process.stderr.readline()
-            logger.error("Failed to start rclone subprocess")
-            logger.error(err.decode())
-            break
-        if "Serving remote control on" in out_line.decode():
-            await asyncio.sleep(1)
-            break
-    logger.info("Started rclone")
-    loop.create_task(log_rclone(rclone_process))
-
-
-async def log_rclone(rclone_process: asyncio.subprocess.Process):
-    rclone_logger.info("Starting rclone logger")
-    while True:
-        out_line = await rclone_process.stdout.readline()
-        if out_line == b"" and rclone_process.returncode == 0:
-            err = await rclone_process.stderr.readline()
-            logger.error("An error occurred with rclone subprocess")
-            logger.error(err.decode())
-            break
-        match = re.match(
-            r"(?:[\d\/])+ (?:[\d:]+) (?P<level>\w+) ? ? :? (?P<message>.*)$",
-            out_line.decode(),
-            flags=2,
-        )
-        data = match.groupdict()
-        levels = {
-            "CRITICAL": 50,
-            "FATAL": 50,
-            "ERROR": 40,
-            "WARNING": 30,
-            "WARN": 30,
-            "INFO": 20,
-            "DEBUG": 10,
-        }
-        rclone_logger.log(
-            levels.get(data.get("levels", "INFO").upper()), data.get("message")
-        )
-
-
-async def rclone_setup(categories: list):
-    """Initializes the rclone.conf file"""
-    rclone_conf = ""
-    for item in mongo.config["rclone"]:
-        rclone_conf += f"\n\n{item}"
-    with open("rclone.conf", "w+", encoding="utf-8") as w:
-        w.write(rclone_conf)
-
-    await restart_rclone()
-
-    for i, category in enumerate(categories):
-        rclone[i] = RCloneAPI(category, i)
-
-
 async def build_metadata():
     while True:
         trigger = mongo.get_next_build_time()
@@ -177,16 +51,27 @@ async def startup():
 
     logger.debug("Initializing core modules...")
 
-    if mongo.get_is_config_init() is True:
-        categories = mongo.get_categories()
+    # the pymongo getters block, so run them in threads and in parallel
+    # instead of paying one serial round-trip each on the event loop
+    is_config_init, categories = await asyncio.gather(
+        asyncio.to_thread(mongo.get_is_config_init),
+        asyncio.to_thread(mongo.get_categories),
+    )
+    if is_config_init is True:
         await rclone_setup(categories)
+        mongo.ensure_home_indexes()
+        loop.create_task(periodic_home_refresh())
         logger.debug("Done.")
     else:
         logger.warning("The site's configuration is not set up")
         # logic for first time setup
 
 
-app = FastAPI(title="Dester", openapi_url=f"{settings.API_V1_STR}/openapi.json")
+app = FastAPI(
+    title="Dester",
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -196,15 +81,15 @@ async def static(_, exception: StarletteHTTPException):
         if os.path.exists("build/index.html"):
             return FileResponse("build/index.html", media_type="text/html")
         else:
-            return UJSONResponse(
+            return ORJSONResponse(
                 status_code=404, content={"ok": False, "message": "Are you lost?"}
             )
     elif exception.status_code == 500:
-        return UJSONResponse(
+        return ORJSONResponse(
             status_code=500, content={"ok": False, "message": "Internal server error"}
         )
     else:
-        return UJSONResponse(
+        return ORJSONResponse(
             status_code=exception.status_code,
             content={"ok": False, "message": "Unknown error"},
         )